@@ -19,6 +19,30 @@ import json
 import argparse
 from pathlib import Path
 
+import numpy as np
+
+try:
+    import orjson
+
+    def _json_arr(arr):
+        """JSON-serialize an ndarray directly (orjson's C float formatter)."""
+        return orjson.dumps(arr, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+except ImportError:
+    # orjson is optional; stdlib json needs plain lists
+    def _json_arr(arr):
+        return json.dumps(np.asarray(arr).tolist())
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the kernels run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        def wrap(func):
+            return func
+        return wrap
+
 # ---------- CONFIG DEFAULTS ----------
 DEFAULT_KML = "Directions from Wagheshwar Temple, Nagar Road, Wagholi, Pune, Maharashtra to MIT ADT UNIVERSITY, Loni Kalbhor, Maharashtra.kml"
 OUTPUT_HTML = "live_route.html"
@@ -28,49 +52,104 @@ WARNING_DISTANCE_M = 80      # show warning when within this many meters
 # -------------------------------------
 
 
+_EMPTY_COORDS = (np.empty(0), np.empty(0))
+
+
+def _parse_tokens_fallback(tokens, sep=None):
+    """
+    Per-point parse used when the vectorized path can't read a block: each
+    token is split by its own width and malformed tokens are skipped, exactly
+    like the original parser. Returns (lat, lon) float64 arrays.
+    """
+    lats = []
+    lons = []
+    for t in tokens:
+        parts = t.split(sep)
+        if len(parts) >= 2:
+            try:
+                lon = float(parts[0]); lat = float(parts[1])
+            except ValueError:
+                continue
+            lats.append(lat); lons.append(lon)
+    return np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+
+
+def _parse_coord_payload(tokens, sep=None):
+    """
+    Parse a block of per-point coordinate tokens ("lon lat [alt]" or
+    "lon,lat[,alt]", with sep the within-point separator) in one vectorized
+    NumPy pass. Returns (lat, lon) float64 arrays.
+    """
+    n_points = len(tokens)
+    if n_points == 0:
+        return _EMPTY_COORDS
+    try:
+        nums = np.fromstring(" ".join(tokens).replace(",", " "), sep=" ")
+    except ValueError:
+        # a non-numeric token in the block; NumPy >= 1.25 raises instead of
+        # stopping early, so recover per token like the original parser
+        return _parse_tokens_fallback(tokens, sep)
+    width = nums.size // n_points
+    if nums.size % n_points != 0 or width < 2:
+        # ragged block (altitude is optional per point, so widths can mix):
+        # no global width to reshape by, parse each point individually
+        return _parse_tokens_fallback(tokens, sep)
+    pts = nums.reshape(n_points, width)
+    # KML stores lon first; return contiguous per-axis arrays (SoA)
+    return pts[:, 1].copy(), pts[:, 0].copy()
+
+
 def extract_coords_from_kml_text(text):
     """
     Tries to extract coordinates from KML text.
-    Returns list of (lat, lon) tuples in order.
+    Returns (lat, lon) float64 arrays in route order (structure-of-arrays so
+    all downstream math stays vectorized).
     Handles:
       - <coordinates>lon,lat[,alt] ...</coordinates>
       - <gx:coord>lon lat [alt]</gx:coord>
+    Uses lxml (C parser) when available, falling back to regex scraping.
     """
-    coords = []
-
-    # 1) try <gx:coord>
-    gx = re.findall(r"<gx:coord>(.*?)</gx:coord>", text, re.S)
-    if gx:
-        for g in gx:
-            parts = g.strip().split()
-            if len(parts) >= 2:
-                try:
-                    lon = float(parts[0]); lat = float(parts[1])
-                    coords.append((lat, lon))
-                except:
-                    continue
-
-    # 2) try <coordinates> blocks (space or newline separated)
-    if not coords:
-        matches = re.findall(r"<coordinates>(.*?)</coordinates>", text, re.S)
-        for m in matches:
-            # coordinates blocks may have many "lon,lat,alt" tokens separated by whitespace
-            tokens = m.strip().replace("\n", " ").split()
-            for t in tokens:
-                parts = t.split(",")
-                if len(parts) >= 2:
-                    try:
-                        lon = float(parts[0]); lat = float(parts[1])
-                        coords.append((lat, lon))
-                    except:
-                        continue
-
-    return coords
-
-
-def haversine_m(a, b):
-    """Return meters between two (lat, lon) points."""
-    lat1, lon1 = a; lat2, lon2 = b
+    gx_payloads = None
+    coord_payloads = None
+    try:
+        from lxml import etree
+        root = etree.fromstring(text.encode("utf-8"))
+    except ImportError:
+        pass
+    except etree.XMLSyntaxError:
+        pass  # not well-formed XML; the regex scraper may still find coords
+    else:
+        gx_payloads = []
+        coord_payloads = []
+        for elem in root.iter():
+            if not isinstance(elem.tag, str) or elem.text is None:
+                continue
+            localname = etree.QName(elem).localname
+            if localname == "coord":
+                gx_payloads.append(elem.text)
+            elif localname == "coordinates":
+                coord_payloads.append(elem.text)
+
+    if gx_payloads is None:
+        gx_payloads = re.findall(r"<gx:coord>(.*?)</gx:coord>", text, re.S)
+        coord_payloads = re.findall(r"<coordinates>(.*?)</coordinates>", text, re.S)
+
+    # 1) try <gx:coord> (one point per element, space-separated components)
+    if gx_payloads:
+        lat, lon = _parse_coord_payload(gx_payloads)
+        if len(lat):
+            return lat, lon
+
+    # 2) try <coordinates> blocks (whitespace-separated "lon,lat[,alt]" tuples)
+    if coord_payloads:
+        return _parse_coord_payload(" ".join(coord_payloads).split(), sep=",")
+
+    return _EMPTY_COORDS
+
+
+@njit(cache=True, fastmath=True)
+def _haversine_kernel(lat1, lon1, lat2, lon2):
+    """Scalar haversine in meters; compiled by numba so the resample loop is cheap."""
     R = 6371000.0
     phi1 = math.radians(lat1); phi2 = math.radians(lat2)
     dphi = math.radians(lat2 - lat1); dlambda = math.radians(lon2 - lon1)
@@ -78,44 +157,110 @@ def haversine_m(a, b):
     return R * 2 * math.atan2(math.sqrt(aa), math.sqrt(1-aa))
 
 
-def resample_route_to_reasonable_points(route, max_segment_m=8.0):
+@njit(cache=True, fastmath=True)
+def _resample_kernel(lat_in, lon_in, max_seg_m):
     """
-    The KML may have long gaps; for smooth animation we resample so each segment < max_segment_m.
-    route: list of (lat, lon)
-    Returns new list of (lat, lon)
+    Densify a route given as lat/lon float64 arrays so each segment < max_seg_m.
+    Two passes (count, then fill preallocated outputs) because numba can't grow lists.
+    Returns (lat_out, lon_out).
     """
-    new = []
-    for i in range(len(route)-1):
-        a = route[i]; b = route[i+1]
-        d = haversine_m(a, b)
-        steps = max(1, int(math.ceil(d / max_segment_m)))
+    n = lat_in.shape[0]
+    total = 1
+    for i in range(n - 1):
+        d = _haversine_kernel(lat_in[i], lon_in[i], lat_in[i+1], lon_in[i+1])
+        total += max(1, int(math.ceil(d / max_seg_m)))
+
+    lat_out = np.empty(total, dtype=np.float64)
+    lon_out = np.empty(total, dtype=np.float64)
+    k = 0
+    for i in range(n - 1):
+        d = _haversine_kernel(lat_in[i], lon_in[i], lat_in[i+1], lon_in[i+1])
+        steps = max(1, int(math.ceil(d / max_seg_m)))
         for s in range(steps):
             t = s / steps
-            lat = a[0] * (1 - t) + b[0] * t
-            lon = a[1] * (1 - t) + b[1] * t
-            new.append((lat, lon))
-    new.append(route[-1])
-    return new
+            lat_out[k] = lat_in[i] * (1 - t) + lat_in[i+1] * t
+            lon_out[k] = lon_in[i] * (1 - t) + lon_in[i+1] * t
+            k += 1
+    lat_out[k] = lat_in[n-1]
+    lon_out[k] = lon_in[n-1]
+    return lat_out, lon_out
 
 
-def build_html(route_latlon, potholes_latlon, segment_durations, output_path,
-               warning_distance_m=80, car_icon_url=None):
+def haversine_m(a, b):
+    """Return meters between two (lat, lon) points."""
+    return _haversine_kernel(a[0], a[1], b[0], b[1])
+
+
+def segment_lengths_m(lat, lon):
     """
-    route_latlon: list of (lat, lon)
-    potholes_latlon: list of (lat, lon)
-    segment_durations: list of seconds per segment (len = len(route)-1)
+    Vectorized haversine over consecutive route points.
+    lat, lon: degree arrays of length N. Returns meters array of length N-1.
     """
-    # prepare JS arrays
-    # route as [[lat,lon],[lat,lon], ...]
-    route_js = json.dumps([[float(lat), float(lon)] for (lat, lon) in route_latlon])
-    potholes_js = json.dumps([[float(lat), float(lon)] for (lat, lon) in potholes_latlon])
-    seg_dur_js = json.dumps([float(x) for x in segment_durations])
+    lat_r = np.deg2rad(np.asarray(lat, dtype=np.float64))
+    lon_r = np.deg2rad(np.asarray(lon, dtype=np.float64))
+    dphi = np.diff(lat_r); dlam = np.diff(lon_r)
+    aa = np.sin(dphi/2)**2 + np.cos(lat_r[:-1])*np.cos(lat_r[1:])*np.sin(dlam/2)**2
+    return 2 * 6371000.0 * np.arctan2(np.sqrt(aa), np.sqrt(1 - aa))
 
-    if not car_icon_url:
-        car_icon_url = "https://cdn-icons-png.flaticon.com/512/744/744465.png"
 
-    # HTML template
-    html = f"""<!doctype html>
+def resample_route_to_reasonable_points(lat, lon, max_segment_m=8.0):
+    """
+    The KML may have long gaps; for smooth animation we resample so each segment < max_segment_m.
+    lat, lon: degree arrays of the route (structure-of-arrays).
+    Returns densified (lat, lon) arrays.
+    """
+    return _resample_kernel(np.ascontiguousarray(lat, dtype=np.float64),
+                            np.ascontiguousarray(lon, dtype=np.float64),
+                            max_segment_m)
+
+
+# Pre-warm the jitted kernels on tiny dummy inputs so type inference and
+# compilation happen at import time (with cache=True the cached object files
+# make this near-instant on every run after the first)
+try:
+    _haversine_kernel(0.0, 0.0, 0.0, 0.0)
+    _resample_kernel(np.zeros(2), np.zeros(2), 6.0)
+except Exception:
+    pass
+
+
+def _equirect_project(lat, lon, cos_mean_lat):
+    """Project lat/lon degree arrays to planar meters (equirectangular)."""
+    return 6371000.0 * np.column_stack([np.deg2rad(lon) * cos_mean_lat,
+                                        np.deg2rad(lat)])
+
+
+def nearest_pothole_per_vertex(route_lat, route_lon, pot_lat, pot_lon):
+    """
+    For every route vertex, find the nearest pothole (straight-line).
+    All inputs are degree arrays (route length N, potholes length P).
+    Returns (idx, dist_m) arrays of length N so the JS animation can look the
+    answer up instead of scanning per frame. Uses a cKDTree on an
+    equirectangular projection (all queries answered in one batched C call);
+    falls back to broadcasted haversine without scipy.
+    """
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        lat1 = np.deg2rad(route_lat)[:, None]
+        lon1 = np.deg2rad(route_lon)[:, None]
+        lat2 = np.deg2rad(pot_lat)[None, :]
+        lon2 = np.deg2rad(pot_lon)[None, :]
+        aa = np.sin((lat2 - lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2 - lon1)/2)**2
+        d = 2 * 6371000.0 * np.arctan2(np.sqrt(aa), np.sqrt(1 - aa))
+        idx = d.argmin(axis=1)
+        return idx, d[np.arange(d.shape[0]), idx]
+
+    # routes here span a few km, so a flat projection is accurate enough
+    cos_mean_lat = math.cos(math.radians(route_lat.mean()))
+    tree = cKDTree(_equirect_project(pot_lat, pot_lon, cos_mean_lat))
+    dist, idx = tree.query(_equirect_project(route_lat, route_lon, cos_mean_lat))
+    return idx, dist
+
+
+# HTML template, split once at import into static chunks and @name@ slots so
+# build_html can stream straight to disk without assembling one giant string
+_HTML_TEMPLATE = """<!doctype html>
 <html>
 <head>
 <meta charset="utf-8"/>
@@ -123,8 +268,8 @@ def build_html(route_latlon, potholes_latlon, segment_durations, output_path,
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
 <style>
-  html,body,#map {{ height:100%; margin:0; padding:0; }}
-  .warning-box {{
+  html,body,#map { height:100%; margin:0; padding:0; }
+  .warning-box {
       position: absolute;
       left: 12px;
       top: 12px;
@@ -137,8 +282,8 @@ def build_html(route_latlon, potholes_latlon, segment_durations, output_path,
       font-weight: 600;
       display: none;
       box-shadow: 0 2px 10px rgba(0,0,0,0.35);
-  }}
-  .hud {{
+  }
+  .hud {
       position: absolute;
       right: 12px;
       top: 12px;
@@ -149,14 +294,14 @@ def build_html(route_latlon, potholes_latlon, segment_durations, output_path,
       font-family: Arial, sans-serif;
       color: #111;
       box-shadow: 0 2px 8px rgba(0,0,0,0.15);
-  }}
+  }
 </style>
 </head>
 <body>
 <div id="map"></div>
 <div class="warning-box" id="warnBox">⚠️ Pothole ahead: <span id="warnDist">--</span> m</div>
 <div class="hud" id="hudBox">
-  <div>Speed: {CAR_SPEED_MPS:.1f} m/s</div>
+  <div>Speed: @car_speed@ m/s</div>
   <div>Next pothole: <span id="hudPDist">--</span> m</div>
 </div>
 
@@ -164,13 +309,26 @@ def build_html(route_latlon, potholes_latlon, segment_durations, output_path,
 <script>
 
 // --- data injected from Python ---
-const route = {route_js};            // array of [lat, lon]
-const potholes = {potholes_js};      // array of [lat, lon]
-const segDurations = {seg_dur_js};   // seconds per segment
-const warningDistance = {warning_distance_m};
+const route = @route_js@;            // array of [lat, lon]
+const potholes = @potholes_js@;      // array of [lat, lon]
+const segDurations = @seg_dur_js@;   // seconds per segment
+const nearestIdxByVertex = @nearest_idx_js@;   // nearest pothole index per route vertex
+const nearestDistByVertex = @nearest_dist_js@; // meters to it, precomputed in Python
+const potholeTrig = @pothole_trig_js@;         // [latRad, lonRad, cos(lat)] per pothole
+const warningDistance = @warning_distance_m@;
+
+// haversine to pothole i using its precomputed radians + cos(lat)
+function distToPothole(carPos, i) {
+  const toRad = Math.PI/180;
+  const lat1 = carPos[0]*toRad, lon1 = carPos[1]*toRad;
+  const p = potholeTrig[i];
+  const sinDlat = Math.sin((p[0]-lat1)/2), sinDlon = Math.sin((p[1]-lon1)/2);
+  const aa = sinDlat*sinDlat + Math.cos(lat1)*p[2]*sinDlon*sinDlon;
+  return 2*6371000*Math.atan2(Math.sqrt(aa), Math.sqrt(1-aa));
+}
 
 // small helper: haversine in meters (lat,lon)
-function haversine_m(a, b) {{
+function haversine_m(a, b) {
   const R = 6371000;
   const toRad = Math.PI/180;
   const lat1 = a[0]*toRad, lon1 = a[1]*toRad;
@@ -179,37 +337,37 @@ function haversine_m(a, b) {{
   const sinDlat = Math.sin(dlat/2), sinDlon = Math.sin(dlon/2);
   const aa = sinDlat*sinDlat + Math.cos(lat1)*Math.cos(lat2)*sinDlon*sinDlon;
   return 2*R*Math.atan2(Math.sqrt(aa), Math.sqrt(1-aa));
-}}
+}
 
 // set up map
 const map = L.map('map').setView(route[0], 14);
-L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
+L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
     maxZoom: 19,
-}}).addTo(map);
+}).addTo(map);
 
 
 // draw route
-const poly = L.polyline(route, {{color: 'blue', weight: 4, opacity:0.85}}).addTo(map);
+const poly = L.polyline(route, {color: 'blue', weight: 4, opacity:0.85}).addTo(map);
 map.fitBounds(poly.getBounds().pad(0.15));
 
 // draw potholes as simple red dots (no popup)
 const potholeMarkers = [];
-for (let i=0;i<potholes.length;i++) {{
+for (let i=0;i<potholes.length;i++) {
   const p = potholes[i];
-  const m = L.circleMarker(p, {{radius:4, color:'red', fillColor:'red', fillOpacity:1}});
+  const m = L.circleMarker(p, {radius:4, color:'red', fillColor:'red', fillOpacity:1});
   m.addTo(map);
   potholeMarkers.push(m);
-}}
+}
 
 // car icon
-const carIcon = L.icon({{
-  iconUrl: '{car_icon_url}',
+const carIcon = L.icon({
+  iconUrl: '@car_icon_url@',
   iconSize: [36,36],
   iconAnchor: [18,18]
-}});
+});
 
 // place car
-let carMarker = L.marker(route[0], {{icon: carIcon}}).addTo(map);
+let carMarker = L.marker(route[0], {icon: carIcon}).addTo(map);
 
 // animation state
 let segmentIndex = 0;           // current segment start index (route[i] -> route[i+1])
@@ -218,88 +376,79 @@ let paused = false;
 
 // compute total route length for info
 let totalDist = 0;
-for (let i=1;i<route.length;i++) {{
+for (let i=1;i<route.length;i++) {
   totalDist += haversine_m(route[i-1], route[i]);
-}}
+}
 
 // animation loop: we use requestAnimationFrame to interpolate along segments using segDurations
-function step(ts) {{
-  if (paused) {{ requestAnimationFrame(step); return; }}
+function step(ts) {
+  if (paused) { requestAnimationFrame(step); return; }
   if (t0 === null) t0 = ts;
 
   // if we finished all segments, stop at last point
-  if (segmentIndex >= segDurations.length) {{
+  if (segmentIndex >= segDurations.length) {
     carMarker.setLatLng(route[route.length-1]);
-    updateWarnings(route.length-1);
+    updateWarningsAt(route.length-1, route[route.length-1]);
     return;
-  }}
-
-  const segDur = segDurations[segmentIndex] * 1000.0; // ms
-  const segStartTime = t0;
-  const elapsed = ts - segStartTime;
-  let frac = elapsed / segDur;
-  if (frac >= 1.0) {{
-    // move to next segment
+  }
+
+  // advance over any segments fully consumed by this frame with a loop
+  // (a slow frame on a dense route used to recurse once per segment and
+  // could blow the stack); t0 accumulates whole segment durations
+  let segDur = segDurations[segmentIndex] * 1000.0; // ms
+  while (ts - t0 >= segDur) {
+    t0 += segDur;
     segmentIndex++;
-    t0 = ts;
-    if (segmentIndex >= segDurations.length) {{
+    if (segmentIndex >= segDurations.length) {
       carMarker.setLatLng(route[route.length-1]);
-      updateWarnings(route.length-1);
-      return;
-    }} else {{
-      // recursive step to handle long frames
-      step(ts);
+      updateWarningsAt(route.length-1, route[route.length-1]);
       return;
-    }}
-  }} else {{
-    // interpolate between route[segmentIndex] -> route[segmentIndex+1]
-    const a = route[segmentIndex];
-    const b = route[segmentIndex+1];
-    const lat = a[0] + (b[0]-a[0])*frac;
-    const lon = a[1] + (b[1]-a[1])*frac;
-    carMarker.setLatLng([lat, lon]);
-    updateWarningsPosition([lat, lon]);
-    requestAnimationFrame(step);
-  }}
-}}
-
-// warning UI update based on current car position (lat,lon)
-function updateWarningsPosition(carPos) {{
-  // find nearest pothole (straight-line)
-  let minD = Infinity;
-  let minIdx = -1;
-  for (let i=0;i<potholes.length;i++) {{
-    const d = haversine_m(carPos, potholes[i]);
-    if (d < minD) {{ minD = d; minIdx = i; }}
-  }}
+    }
+    segDur = segDurations[segmentIndex] * 1000.0;
+  }
+
+  // interpolate between route[segmentIndex] -> route[segmentIndex+1]
+  const frac = (ts - t0) / segDur;
+  const a = route[segmentIndex];
+  const b = route[segmentIndex+1];
+  const lat = a[0] + (b[0]-a[0])*frac;
+  const lon = a[1] + (b[1]-a[1])*frac;
+  carMarker.setLatLng([lat, lon]);
+  updateWarningsAt(segmentIndex, [lat, lon]);
+  requestAnimationFrame(step);
+}
+
+// warning UI update from the precomputed per-vertex nearest-pothole tables:
+// O(1) lookup instead of a haversine scan over all potholes every frame
+function updateWarningsAt(vertexIndex, carPos) {
+  const minIdx = nearestIdxByVertex[vertexIndex];
+  let minD = nearestDistByVertex[vertexIndex];
+  if (minD <= warningDistance * 2) {
+    // close to a pothole: refine with one haversine from the interpolated position
+    minD = distToPothole(carPos, minIdx);
+  }
   const hudP = document.getElementById('hudPDist');
   hudP.textContent = Math.round(minD);
 
   const warnBox = document.getElementById('warnBox');
   const warnDistSpan = document.getElementById('warnDist');
-  if (minD <= warningDistance) {{
+  if (minD <= warningDistance) {
     warnDistSpan.textContent = Math.round(minD);
     warnBox.style.display = 'block';
     // highlight the pothole marker (make it bigger) to draw attention
-    potholeMarkers.forEach((m, idx) => {{
-      if (idx === minIdx) {{
-        m.setStyle({{radius:7}});
-      }} else {{
-        m.setStyle({{radius:4}});
-      }}
-    }});
-  }} else {{
+    potholeMarkers.forEach((m, idx) => {
+      if (idx === minIdx) {
+        m.setStyle({radius:7});
+      } else {
+        m.setStyle({radius:4});
+      }
+    });
+  } else {
     warnBox.style.display = 'none';
     // reset sizes
-    potholeMarkers.forEach((m) => m.setStyle({{radius:4}}));
-  }}
-}}
-
-// also update warnings at final points
-function updateWarnings(lastIndex) {{
-  const pos = route[lastIndex];
-  updateWarningsPosition(pos);
-}}
+    potholeMarkers.forEach((m) => m.setStyle({radius:4}));
+  }
+}
 
 // start animation
 requestAnimationFrame(step);
@@ -308,7 +457,52 @@ requestAnimationFrame(step);
 </body>
 </html>
 """
-    Path(output_path).write_text(html, encoding="utf-8")
+
+_TEMPLATE_PARTS = re.split(r"@(\w+)@", _HTML_TEMPLATE)
+
+
+def build_html(route_lat, route_lon, pot_lat, pot_lon, segment_durations,
+               output_path, nearest_idx, nearest_dist, warning_distance_m=80,
+               car_icon_url=None):
+    """
+    route_lat / route_lon: degree arrays of the resampled route
+    pot_lat / pot_lon: degree arrays of the pothole positions
+    segment_durations: seconds per segment (len = len(route)-1)
+    nearest_idx / nearest_dist: per-route-vertex nearest pothole index and
+    distance in meters (from nearest_pothole_per_vertex)
+    """
+    # prepare JS arrays; AoS pairs are materialized only here, at the
+    # serialization boundary, and serialized straight from ndarrays
+    route_js = _json_arr(np.column_stack([route_lat, route_lon]))
+    potholes_js = _json_arr(np.column_stack([pot_lat, pot_lon]))
+    seg_dur_js = _json_arr(np.asarray(segment_durations, dtype=np.float64))
+    nearest_idx_js = _json_arr(np.asarray(nearest_idx, dtype=np.int64))
+    nearest_dist_js = _json_arr(np.round(np.asarray(nearest_dist, dtype=np.float64), 1))
+
+    # per-pothole [latRad, lonRad, cos(lat)] so the JS distance check does no
+    # degree conversion or cos() on the pothole side
+    pot_lat_rad = np.deg2rad(pot_lat)
+    pothole_trig_js = _json_arr(
+        np.column_stack([pot_lat_rad, np.deg2rad(pot_lon), np.cos(pot_lat_rad)]))
+
+    if not car_icon_url:
+        car_icon_url = "https://cdn-icons-png.flaticon.com/512/744/744465.png"
+
+    values = {
+        "route_js": route_js,
+        "potholes_js": potholes_js,
+        "seg_dur_js": seg_dur_js,
+        "nearest_idx_js": nearest_idx_js,
+        "nearest_dist_js": nearest_dist_js,
+        "pothole_trig_js": pothole_trig_js,
+        "warning_distance_m": str(warning_distance_m),
+        "car_speed": f"{CAR_SPEED_MPS:.1f}",
+        "car_icon_url": car_icon_url,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        # odd indices are placeholder names, even indices are static chunks
+        for i, part in enumerate(_TEMPLATE_PARTS):
+            f.write(values[part] if i % 2 else part)
     print(f"✅ Wrote animation to {output_path}")
 
 
@@ -326,29 +520,35 @@ def main():
         return
 
     text = kml_path.read_text(encoding="utf-8")
-    coords = extract_coords_from_kml_text(text)
-    if not coords:
+    lat, lon = extract_coords_from_kml_text(text)
+    if len(lat) == 0:
         print("ERROR: No coordinates found in KML. Are you sure the file contains a route?")
         return
 
-    # coords is list of (lat, lon) (we normalized earlier)
+    # the route stays as parallel lat/lon arrays (structure-of-arrays) end to
+    # end, so resampling, durations and nearest-pothole all run vectorized
     # Resample to ensure smooth animation: keep segments reasonably small (~<=8 m)
-    route = resample_route_to_reasonable_points(coords, max_segment_m=6.0)
+    lat, lon = resample_route_to_reasonable_points(lat, lon, max_segment_m=6.0)
 
-    # compute per-segment durations using CAR_SPEED_MPS (seconds)
-    seg_durations = []
-    for i in range(len(route)-1):
-        d = haversine_m(route[i], route[i+1])
-        duration = d / CAR_SPEED_MPS
-        seg_durations.append(max(0.01, duration))  # avoid zero
+    # compute per-segment durations using CAR_SPEED_MPS (seconds), one
+    # vectorized pass instead of a Python loop over every segment
+    dists = segment_lengths_m(lat, lon)
+    seg_durations = np.maximum(dists / CAR_SPEED_MPS, 0.01)  # avoid zero
 
     # choose potholes randomly (indices)
-    n_potholes = max(1, min(args.potholes, len(route)//4))
-    pothole_indices = random.sample(range(5, max(6,len(route)-6)), n_potholes)
-    potholes = [route[i] for i in pothole_indices]
+    n_route = len(lat)
+    n_potholes = max(1, min(args.potholes, n_route//4))
+    pothole_indices = np.array(random.sample(range(5, max(6, n_route-6)), n_potholes))
+    pot_lat = lat[pothole_indices]
+    pot_lon = lon[pothole_indices]
+
+    # Precompute nearest pothole per route vertex so the JS animation does an
+    # O(1) table lookup instead of scanning every pothole each frame
+    nearest_idx, nearest_dist = nearest_pothole_per_vertex(lat, lon, pot_lat, pot_lon)
 
     # Build HTML
-    build_html(route, potholes, seg_durations, args.out, warning_distance_m=args.warning)
+    build_html(lat, lon, pot_lat, pot_lon, seg_durations, args.out,
+               nearest_idx, nearest_dist, warning_distance_m=args.warning)
 
 if __name__ == "__main__":
     main()